@@ -6,14 +6,38 @@ Compatible with Python 3.13 and latest telegram library versions
 """
 
 import re
+import html
 import logging
 import json
 import os
 import asyncio
+import functools
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
+from datetime import datetime, timezone
+
+# Use uvloop (libuv-backed event loop) when available for faster asyncio
+# scheduling and socket I/O - must be installed before any loop is created
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    uvloop = None
+
+# orjson (Rust-backed) serializes several times faster than stdlib json;
+# fall back to stdlib when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from pathlib import Path
 from telegram import Update, BotCommand
+from telegram.constants import ParseMode
 from telegram.ext import Application, MessageHandler, filters, ContextTypes, CommandHandler
-from telegram.error import TelegramError
+from telegram.error import TelegramError, RetryAfter
+from telegram.helpers import escape_markdown
 
 # =============================================================================
 # CONFIGURATION SECTION
@@ -22,6 +46,7 @@ from telegram.error import TelegramError
 fixed_anime_name = ""  # Global variable to store fixed anime name (empty = auto-detect)
 BOT_TOKEN = "8480202493:AAH7BGoSrOS4xu5TYxbamcJXAcqhE4GSU5k"  # Replace with your actual bot token
 dump_channel_id = ""  # Dump channel ID (will be configurable via commands)
+log_channel_id = os.environ.get("LOG_CHANNEL_ID", "")  # Log channel for monitoring (optional)
 
 # Configuration file to persist settings - Fixed path handling
 def get_config_file_path():
@@ -65,10 +90,16 @@ CONFIG_FILE = get_config_file_path()
 # LOGGING SETUP
 # =============================================================================
 
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
+# Handlers run on a QueueListener thread so emitting a record from the
+# event loop never blocks on stream/disk I/O
+_log_queue = queue.Queue(-1)
+_stream_handler = logging.StreamHandler()
+_stream_handler.setFormatter(
+    logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 )
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(_log_queue)])
+_log_listener = QueueListener(_log_queue, _stream_handler)
+_log_listener.start()
 logger = logging.getLogger(__name__)
 
 # =============================================================================
@@ -78,12 +109,81 @@ logger = logging.getLogger(__name__)
 message_count = 0
 prefixes = ["/leech -n", "/leech1 -n", "/leech2 -n", "/leechx -n", "/leech4 -n", "/leech3 -n", "/leech5 -n"]
 
+# Flat rotation tuple (each prefix repeated 3x) rebuilt only when prefixes
+# change, so the hot path does a single modulo + tuple index per message
+_prefix_cycle = ()
+
+# Rendered /prefixlist body, rebuilt lazily after the list mutates
+_prefix_list_cache = None
+
+# Set companion to the ordered list for O(1) duplicate checks
+_prefix_set = frozenset(prefixes)
+
+def _rebuild_prefix_cycle():
+    """Rebuild the expanded prefix rotation tuple after prefixes mutate"""
+    global _prefix_cycle, _prefix_list_cache, _prefix_set
+    _prefix_cycle = tuple(p for p in prefixes for _ in range(3))
+    _prefix_list_cache = None
+    _prefix_set = frozenset(prefixes)
+
+_rebuild_prefix_cycle()
+
+# Caps how many captions are formatted at once when updates are dispatched
+# concurrently; I/O-bound handlers can still fan out beyond this
+_format_semaphore = asyncio.Semaphore(64)
+
 # =============================================================================
 # CONFIGURATION MANAGEMENT WITH IMPROVED ERROR HANDLING
 # =============================================================================
 
+_config_dirty = False
+
+def mark_config_dirty():
+    """Flag that in-memory settings have diverged from the config file"""
+    global _config_dirty
+    _config_dirty = True
+
 def save_config():
     """Save bot configuration to file with error handling"""
+    global _config_dirty
+    _config_dirty = False
+    return _do_save()
+
+async def save_config_async():
+    """Save configuration off the event loop, only when something changed"""
+    global _config_dirty
+    if not _config_dirty:
+        return True
+    _config_dirty = False
+    return await asyncio.to_thread(_do_save)
+
+# Single long-lived writer task (started in post_init) instead of
+# spawning a fresh debounce task per mutation burst
+_config_dirty_event = asyncio.Event()
+_config_writer_task = None
+
+def _schedule_save():
+    """Debounced save: coalesce a burst of mutations into one disk write"""
+    mark_config_dirty()
+    _config_dirty_event.set()
+
+async def _config_writer():
+    """Persistent writer: wake on dirty, wait out the window, flush once"""
+    while True:
+        await _config_dirty_event.wait()
+        await asyncio.sleep(0.5)
+        _config_dirty_event.clear()
+        try:
+            await save_config_async()
+        except Exception as e:
+            logger.error(f"Config writer flush failed: {e}")
+
+# Set after the config directory has been created so steady-state saves
+# skip the per-call mkdir syscalls
+_config_dir_ready = False
+
+def _do_save():
+    """Serialize and atomically write the current configuration"""
     config = {
         "fixed_anime_name": fixed_anime_name,
         "prefixes": prefixes,
@@ -91,30 +191,40 @@ def save_config():
         "message_count": message_count
     }
     
+    global _config_dir_ready
+
     max_attempts = 3
     for attempt in range(max_attempts):
         try:
-            # Ensure directory exists
-            directory = os.path.dirname(CONFIG_FILE)
-            if directory:
-                Path(directory).mkdir(parents=True, exist_ok=True)
-            
+            # Ensure directory exists (probed once; a failed save clears
+            # the flag so the next attempt re-creates it)
+            if not _config_dir_ready:
+                directory = os.path.dirname(CONFIG_FILE)
+                if directory:
+                    Path(directory).mkdir(parents=True, exist_ok=True)
+                _config_dir_ready = True
+
             # Write config with atomic operation
             temp_file = CONFIG_FILE + ".tmp"
-            with open(temp_file, 'w') as f:
-                json.dump(config, f, indent=2)
-            
-            # Atomic move
-            if os.path.exists(CONFIG_FILE):
-                os.replace(temp_file, CONFIG_FILE)
+            if orjson is not None:
+                buf = orjson.dumps(config)
             else:
-                os.rename(temp_file, CONFIG_FILE)
+                buf = json.dumps(config, separators=(',', ':')).encode()
+            with open(temp_file, 'wb') as f:
+                f.write(buf)
+                f.flush()
+                os.fsync(f.fileno())
+
+            # os.replace is atomic and overwrites unconditionally on all
+            # supported platforms - no exists() pre-check needed
+            os.replace(temp_file, CONFIG_FILE)
             
-            logger.info(f"Configuration saved successfully to {CONFIG_FILE}")
+            logger.info("Configuration saved successfully to %s", CONFIG_FILE)
             return True
             
         except (OSError, IOError, PermissionError) as e:
-            logger.warning(f"Failed to save config (attempt {attempt + 1}): {e}")
+            _config_dir_ready = False
+            logger.warning("Failed to save config (attempt %d): %s", attempt + 1, e)
             if attempt == max_attempts - 1:
                 logger.error(f"Failed to save config after {max_attempts} attempts: {e}")
                 return False
@@ -124,19 +234,34 @@ def save_config():
     
     return False
 
+# mtime of the config file at the last successful load; reloads with an
+# unchanged stamp skip the read and parse entirely
+_config_mtime_ns = 0
+
 def load_config():
     """Load bot configuration from file with error handling"""
     global fixed_anime_name, prefixes, dump_channel_id, message_count
     
     try:
+        global _config_mtime_ns
+
         if not os.path.exists(CONFIG_FILE):
-            logger.info(f"Config file {CONFIG_FILE} doesn't exist, creating default config")
+            logger.info("Config file %s doesn't exist, creating default config", CONFIG_FILE)
             save_config()  # Create default config
             return True
-        
-        with open(CONFIG_FILE, 'r') as f:
-            config = json.load(f)
-        
+
+        # Skip the read+parse when the file hasn't changed since the
+        # last load (reload paths hit this; first load never does)
+        mtime_ns = os.stat(CONFIG_FILE).st_mtime_ns
+        if mtime_ns == _config_mtime_ns:
+            logger.info("Config file unchanged, keeping in-memory settings")
+            return True
+
+        with open(CONFIG_FILE, 'rb') as f:
+            raw = f.read()
+        config = orjson.loads(raw) if orjson is not None else json.loads(raw)
+        _config_mtime_ns = mtime_ns
+
         # Load with defaults for missing keys
         fixed_anime_name = config.get("fixed_anime_name", "")
         prefixes = config.get("prefixes", ["/leech -n", "/leech1 -n", "/leech2 -n", "/leechx -n", "/leech4 -n", "/leech3 -n", "/leech5 -n"])
@@ -149,15 +274,18 @@ def load_config():
         
         if not isinstance(message_count, int) or message_count < 0:
             message_count = 0
-        
-        logger.info(f"Configuration loaded successfully from {CONFIG_FILE}")
+
+        _rebuild_prefix_cycle()
+
+        logger.info("Configuration loaded successfully from %s", CONFIG_FILE)
         return True
         
     except (OSError, IOError) as e:
         logger.error(f"Failed to load config file: {e}")
         logger.info("Using default configuration")
         return False
-    except json.JSONDecodeError as e:
+    except ValueError as e:
+        # Covers both json.JSONDecodeError and orjson.JSONDecodeError
         logger.error(f"Invalid JSON in config file: {e}")
         logger.info("Creating new config file with defaults")
         save_config()
@@ -173,27 +301,86 @@ def load_config():
 
 QUALITY_ORDER = ["480P", "720P", "1080P"]
 
+# =============================================================================
+# PRE-COMPILED REGEX PATTERNS (compiled once at import, reused per caption)
+# =============================================================================
+
+# All episode formats fused into one alternation so a single scan replaces
+# the old cascade of up to six searches. Branch order mirrors the old
+# priority: channel prefix formats, then bracket, then bare S/E.
+_EPISODE_RE = re.compile(
+    r'@\w+\s*-\s*(?P<cname>.+?)\s+S(?P<cs>\d+)\s*EP(?P<ce>\d+)'
+    r'|@\w+\s*-\s*\[S(?P<cbs>\d+)\s*EP(?P<cbe>\d+)\]\s*(?P<cbname>.+?)(?:\s*\[|$)'
+    r'|\[S(?P<bs>\d+)\s*EP?(?P<be>\d+)\]'
+    r'|S(?P<ss>\d+)\s*EP?(?P<se>\d+)',
+    re.IGNORECASE
+)
+
+# String form: the regex yields digit strings, so membership needs no
+# int() round-trip per match
+_VALID_QUALITIES = frozenset({'144', '240', '360', '480', '720', '1080', '1440', '2160'})
+
+# Channel prefix plus bracketed/parenthesised junk in one alternation;
+# edge dashes separately since stripping brackets can expose a new
+# leading/trailing dash
+_UNWANTED_RE = re.compile(r'^@\w+\s*-\s*|\[.*?\]|\(.*?\)', re.IGNORECASE)
+_DASH_EDGE_RE = re.compile(r'^\s*-\s*|\s*-\s*$')
+
+_STRUCTURED_TITLE_RE = re.compile(r'📺\s*([^\[]+)\s*\[S(\d+)\]', re.IGNORECASE)
+_STRUCTURED_EPISODE_RE = re.compile(r'Eᴘɪꜱᴏᴅᴇ\s*:\s*(\d+)', re.IGNORECASE)
+_AUDIO_RE = re.compile(r'(?:Aᴜᴅɪᴏ|Audio)\s*:\s*([^,\n\]]+)', re.IGNORECASE)
+# Punctuation deletion as a C-level translate instead of a regex pass
+_PUNCT_TABLE = str.maketrans('', '', '!@#$%^&*(),.?":{}|<>')
+
+# Cheap prefilter for the media handler: anything the parser can make use
+# of carries at least one of these anchors - an S<digit> or EP episode
+# marker, a bracket, a quality like 1080p, or the structured-format
+# fields, including a bare "Quality :" label in either spelling. Only
+# captions with none of them skip the parse entirely.
+_FAST_REJECT_RE = re.compile(r'[sS]\d|[Ee][Pp]|\[|\d{3,4}[pP]|(?i:quality)\s*:|Qᴜᴀʟɪᴛʏ\s*:|Eᴘɪꜱᴏᴅᴇ|📺')
+
+# All word replacements in one alternation resolved through a callback
+_REPL_RE = re.compile(r'\b(Tamil|English|Dubbed|Subbed)\b', re.IGNORECASE)
+_REPL_MAP = {'tamil': 'Tam', 'english': 'Eng', 'dubbed': 'Dub', 'subbed': 'Sub'}
+
+_LANGUAGE_MAPPINGS = {
+    'தமிழ்': 'Tam',
+    'tamil': 'Tam',
+    'tam': 'Tam',
+    'english': 'Eng',
+    'eng': 'Eng',
+    'multi audio': 'Multi',
+    'multi': 'Multi',
+    'dual audio': 'Dual',
+    'dual': 'Dual',
+}
+
+# Single alternation so all language keywords are found in one scan instead
+# of one substring pass per key; longest keys first so 'multi audio' wins
+# over 'multi'. Input is pre-lowered, no IGNORECASE needed.
+_LANG_RE = re.compile('|'.join(
+    re.escape(key) for key in sorted(_LANGUAGE_MAPPINGS, key=len, reverse=True)
+))
+
+# Master scan fusing the quality, language-keyword and extension tokens
+# into one pass over the caption; dispatch on lastgroup. The Audio:
+# section is deliberately NOT a branch here - its free-text capture
+# would swallow quality/extension tokens on the same line, so parse_all
+# resolves it with a separate bounded _AUDIO_RE pass instead.
+_SCAN_RE = re.compile(
+    r'(?:Qᴜᴀʟɪᴛʏ|QUALITY)\s*:\s*(?P<ql>\d+)[pP]?'
+    r'|\[(?P<qb>\d+)[pP]?\]'
+    r'|(?P<qs>\d+)\s*[pP]'
+    r'|(?P<lang>'
+    + '|'.join(re.escape(key) for key in sorted(_LANGUAGE_MAPPINGS, key=len, reverse=True))
+    + r')'
+    r'|\.(?P<ext>mkv|mp4|avi)\b',
+    re.IGNORECASE
+)
+
 class AnimeParser:
     """Enhanced anime caption parser with multiple format support and professional quality handling"""
-    
-    def __init__(self):
-        self.patterns = {
-            # Standard bracket formats
-            'bracket_se': r'\[S(\d+)\s*E(\d+)\]',
-            'bracket_sep': r'\[S(\d+)\s*EP(\d+)\]',
-            
-            # Channel prefix formats
-            'channel_se': r'@\w+\s*-\s*(.+?)\s+S(\d+)\s*EP(\d+)',
-            'channel_bracket': r'@\w+\s*-\s*\[S(\d+)\s*EP(\d+)\]\s*(.+?)(?:\s*\[|$)',
-            
-            # Structured format with emojis
-            'structured_emoji': r'📺\s*([^\[]+)\s*\[S(\d+)\]',
-            
-            # Simple formats
-            'simple_se': r'S(\d+)\s*E(\d+)',
-            'simple_ep': r'S(\d+)\s*EP(\d+)',
-        }
-    
+
     def extract_episode_info(self, text):
         """Extract season, episode, and anime name from various formats"""
         season = "01"
@@ -206,34 +393,23 @@ class AnimeParser:
             if "📺" in clean_text and "Eᴘɪꜱᴏᴅᴇ" in clean_text:
                 return self._parse_structured_format(clean_text)
             
-            for pattern_name in ['channel_se', 'channel_bracket']:
-                pattern = self.patterns[pattern_name]
-                match = re.search(pattern, clean_text, re.IGNORECASE)
-                if match:
-                    if pattern_name == 'channel_se':
-                        anime_name, season, episode = match.groups()
-                    else:
-                        season, episode, anime_name = match.groups()
-                    return season.zfill(2), episode.zfill(2), anime_name.strip()
-            
-            for pattern_name in ['bracket_se', 'bracket_sep']:
-                pattern = self.patterns[pattern_name]
-                match = re.search(pattern, clean_text, re.IGNORECASE)
-                if match:
-                    season, episode = match.groups()
-                    anime_name = re.split(r'\[S\d+', clean_text, flags=re.IGNORECASE)[0].strip()
-                    return season.zfill(2), episode.zfill(2), anime_name
-            
-            for pattern_name in ['simple_se', 'simple_ep']:
-                pattern = self.patterns[pattern_name]
-                match = re.search(pattern, clean_text, re.IGNORECASE)
-                if match:
-                    season, episode = match.groups()
-                    anime_name = re.split(r'S\d+', clean_text, flags=re.IGNORECASE)[0].strip()
-                    return season.zfill(2), episode.zfill(2), anime_name
+            match = _EPISODE_RE.search(clean_text)
+            if match:
+                if match.group('cs'):
+                    return (match.group('cs').zfill(2), match.group('ce').zfill(2),
+                            match.group('cname').strip())
+                if match.group('cbs'):
+                    return (match.group('cbs').zfill(2), match.group('cbe').zfill(2),
+                            match.group('cbname').strip())
+                # The match already marks where the episode token starts;
+                # slicing up to it replaces a second regex split pass
+                anime_name = clean_text[:match.start()].strip()
+                if match.group('bs'):
+                    return match.group('bs').zfill(2), match.group('be').zfill(2), anime_name
+                return match.group('ss').zfill(2), match.group('se').zfill(2), anime_name
         
         except Exception as e:
-            logger.warning(f"Error parsing episode info: {e}")
+            logger.warning("Error parsing episode info: %s", e)
         
         return season, episode, clean_text
     
@@ -244,170 +420,570 @@ class AnimeParser:
         anime_name = ""
         
         try:
-            title_match = re.search(r'📺\s*([^\[]+)\s*\[S(\d+)\]', text, re.IGNORECASE)
+            title_match = _STRUCTURED_TITLE_RE.search(text)
             if title_match:
                 anime_name = title_match.group(1).strip()
                 season = title_match.group(2).zfill(2)
-            
-            episode_match = re.search(r'Eᴘɪꜱᴏᴅᴇ\s*:\s*(\d+)', text, re.IGNORECASE)
+
+            episode_match = _STRUCTURED_EPISODE_RE.search(text)
             if episode_match:
                 episode = episode_match.group(1).zfill(2)
         
         except Exception as e:
-            logger.warning(f"Error parsing structured format: {e}")
+            logger.warning("Error parsing structured format: %s", e)
         
         return season, episode, anime_name
     
-    def extract_quality(self, text):
-        """Extract video quality from text and ensure it ends with 'P'"""
-        if not text:
-            return "720P"
-        
-        try:
-            quality_patterns = [
-                r'(\d+)[pP]',
-                r'\[(\d+)[pP]?\]',
-                r'Qᴜᴀʟɪᴛʏ\s*:\s*(\d+)[pP]?',
-                r'QUALITY\s*:\s*(\d+)[pP]?',
-                r'(\d+)\s*[pP]',
-            ]
-            
-            for pattern in quality_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    quality_number = match.group(1)
-                    if quality_number.isdigit() and int(quality_number) in [144, 240, 360, 480, 720, 1080, 1440, 2160]:
-                        return f"{quality_number}P"
-        
-        except Exception as e:
-            logger.warning(f"Error extracting quality: {e}")
-        
-        return "720P"
-    
-    def extract_language(self, text):
-        """Extract language/audio information"""
-        if not text:
-            return ""
-        
+    def parse_all(self, text):
+        """Extract quality, language and extension in a single scan"""
+        quality = None
+        language = None
+        extension = None
+
         try:
-            language_mappings = {
-                'தமிழ்': 'Tam',
-                'tamil': 'Tam',
-                'tam': 'Tam',
-                'english': 'Eng',
-                'eng': 'Eng',
-                'multi audio': 'Multi',
-                'multi': 'Multi',
-                'dual audio': 'Dual',
-                'dual': 'Dual',
-            }
-            
-            audio_match = re.search(r'(?:Aᴜᴅɪᴏ|Audio)\s*:\s*([^,\n\]]+)', text, re.IGNORECASE)
+            for match in _SCAN_RE.finditer(text):
+                group = match.lastgroup
+                if group in ('ql', 'qb', 'qs'):
+                    # Latch only a recognised quality; an invalid digit run
+                    # (e.g. "Season 2 P...") must not stop the scan
+                    if quality is None:
+                        number = match.group(group)
+                        if number in _VALID_QUALITIES:
+                            quality = f"{number}P"
+                elif group == 'lang':
+                    if language is None:
+                        language = _LANGUAGE_MAPPINGS[match.group('lang').lower()]
+                elif group == 'ext' and extension is None:
+                    extension = f".{match.group('ext').lower()}"
+
+            # An explicit Audio: section outranks a bare keyword elsewhere.
+            # Separate pass so its free-text capture cannot swallow the
+            # quality/extension tokens from the fused scan above.
+            audio_match = _AUDIO_RE.search(text)
             if audio_match:
-                audio_text = audio_match.group(1).strip().lower()
-                for key, value in language_mappings.items():
-                    if key in audio_text:
-                        return value
-            
-            text_lower = text.lower()
-            for key, value in language_mappings.items():
-                if key in text_lower:
-                    return value
-        
+                lang_match = _LANG_RE.search(audio_match.group(1).lower())
+                if lang_match:
+                    language = _LANGUAGE_MAPPINGS[lang_match.group(0)]
+
         except Exception as e:
-            logger.warning(f"Error extracting language: {e}")
-        
-        return ""
-    
+            logger.warning("Error scanning caption: %s", e)
+
+        return {
+            'quality': quality or "720P",
+            'language': language or "",
+            'extension': extension or ".mkv",
+        }
+
     def clean_anime_name(self, name):
         """Clean and standardize anime name"""
         if not name:
             return ""
         
         try:
-            name = re.sub(r'^@\w+\s*-\s*', '', name, flags=re.IGNORECASE)
-            
-            unwanted_patterns = [
-                r'\[.*?\]',
-                r'\(.*?\)',
-                r'^\s*-\s*',
-                r'\s*-\s*$',
-            ]
-            
-            for pattern in unwanted_patterns:
-                name = re.sub(pattern, '', name, flags=re.IGNORECASE)
-            
-            replacements = {
-                'Tamil': 'Tam',
-                'English': 'Eng',
-                'Dubbed': 'Dub',
-                'Subbed': 'Sub',
-            }
-            
-            for old, new in replacements.items():
-                name = re.sub(rf'\b{old}\b', new, name, flags=re.IGNORECASE)
-            
-            name = re.sub(r'[!@#$%^&*(),.?":{}|<>]', '', name)
-            name = re.sub(r'\s+', ' ', name).strip()
+            name = _UNWANTED_RE.sub('', name)
+            name = _DASH_EDGE_RE.sub('', name)
+            name = _REPL_RE.sub(lambda m: _REPL_MAP[m.group(1).lower()], name)
+            name = name.translate(_PUNCT_TABLE)
+            # split()/join collapses whitespace runs and trims ends in
+            # one C pass - no regex machinery for the final cleanup
+            name = ' '.join(name.split())
         
         except Exception as e:
-            logger.warning(f"Error cleaning anime name: {e}")
+            logger.warning("Error cleaning anime name: %s", e)
             return name
         
         return name
 
+# Shared stateless parser instance - all patterns are module-level constants,
+# so one instance can serve every message without per-call allocation
+_PARSER = AnimeParser()
+
+@functools.lru_cache(maxsize=2048)
+def _parse_fields(caption: str, fixed_name: str) -> str:
+    """Pure caption -> formatted body (everything except the prefix)
+
+    Deterministic in its arguments, so repeat captions - common when
+    channels forward batches of the same show - hit the LRU cache and
+    skip the regex work entirely. fixed_name is part of the key, so a
+    /name change simply starts populating fresh entries.
+    """
+    parser = _PARSER
+    original_caption = caption.strip()
+
+    season, episode, extracted_name = parser.extract_episode_info(original_caption)
+    scan = parser.parse_all(original_caption)
+    quality = scan['quality']
+    language = scan['language']
+
+    if fixed_name:
+        anime_name = fixed_name
+    else:
+        anime_name = parser.clean_anime_name(extracted_name) or "Unknown Anime"
+
+    if language and language not in anime_name:
+        anime_name = f"{anime_name} {language}".strip()
+
+    return f"[S{season}-E{episode}] {anime_name} [{quality}] [Single]{scan['extension']}"
+
 def parse_caption(caption: str) -> str:
     """Enhanced caption parser with support for multiple formats"""
-    global message_count, fixed_anime_name
-    
+    global message_count
+
     try:
         message_count += 1
-        
+        bot_stats.messages_processed += 1
+
         if not caption:
             return ""
-        
-        parser = AnimeParser()
-        original_caption = caption.strip()
-        
-        clean_caption = original_caption
-        if " - " in clean_caption and clean_caption.startswith("@"):
-            parts = clean_caption.split(" - ", 1)
-            if len(parts) > 1:
-                clean_caption = parts[1]
-        
-        season, episode, extracted_name = parser.extract_episode_info(original_caption)
-        quality = parser.extract_quality(original_caption)
-        language = parser.extract_language(original_caption)
-        
-        if fixed_anime_name:
-            anime_name = fixed_anime_name
-        else:
-            anime_name = parser.clean_anime_name(extracted_name) or "Unknown Anime"
-        
-        if language and language not in anime_name:
-            anime_name = f"{anime_name} {language}".strip()
-        
-        season_episode = f"[S{season}-E{episode}]"
-        
-        extension = ".mkv"
-        if ".mp4" in original_caption.lower():
-            extension = ".mp4"
-        elif ".avi" in original_caption.lower():
-            extension = ".avi"
-        
-        if prefixes:
-            prefix_index = (message_count - 1) // 3 % len(prefixes)
-            current_prefix = prefixes[prefix_index]
+
+        body = _parse_fields(caption, fixed_anime_name)
+
+        if _prefix_cycle:
+            current_prefix = _prefix_cycle[(message_count - 1) % len(_prefix_cycle)]
         else:
             current_prefix = "/leech -n"
-        
-        formatted_caption = f"{current_prefix} {season_episode} {anime_name} [{quality}] [Single]{extension}"
-        
+
+        formatted_caption = f"{current_prefix} {body}"
+
+        bot_stats.successful_formats += 1
         return formatted_caption
-    
-    except Exception as e:
-        logger.error(f"Error parsing caption: {e}")
-        return f"/leech -n [S01-E01] Unknown Anime [720P] [Single].mkv"
+
+    except Exception:
+        bot_stats.failed_formats += 1
+        bot_stats.errors += 1
+        logger.exception("Error parsing caption")
+        return "/leech -n [S01-E01] Unknown Anime [720P] [Single].mkv"
+
+# =============================================================================
+# BOT STATISTICS
+# =============================================================================
+
+class BotStats:
+    """Runtime counters for monitoring - slotted so the per-message
+    increments are plain attribute writes instead of dict lookups"""
+
+    __slots__ = (
+        'start_time', 'messages_processed', 'successful_formats',
+        'failed_formats', 'dump_channel_sends', 'dump_channel_fails', 'errors',
+        'last_dump_ok_ts', '_footer', '_footer_key'
+    )
+
+    def __init__(self):
+        self.start_time = datetime.now(timezone.utc)
+        self.messages_processed = 0
+        self.successful_formats = 0
+        self.failed_formats = 0
+        self.dump_channel_sends = 0
+        self.dump_channel_fails = 0
+        self.errors = 0
+        self.last_dump_ok_ts = None
+        self._footer = ""
+        self._footer_key = None
+
+    @property
+    def footer(self):
+        """One-line stats summary, reformatted only when the counters move"""
+        key = (self.messages_processed, self.errors)
+        if key != self._footer_key:
+            self._footer_key = key
+            self._footer = f"🔢 Stats: {key[0]} processed, {key[1]} errors"
+        return self._footer
+
+bot_stats = BotStats()
+
+def _success_rate():
+    """Success percentage over all format attempts (single shared helper)"""
+    total = bot_stats.successful_formats + bot_stats.failed_formats
+    return (bot_stats.successful_formats * 100.0 / total) if total else 0.0
+
+# =============================================================================
+# HEALTH CHECK SERVER (Render probes /health - see render.yaml)
+# =============================================================================
+
+# Monotonic start reference: uptime becomes a float subtraction instead of
+# allocating two tz-aware datetimes per probe
+_MONO_START = time.monotonic()
+_uptime_cache = (-1, "")
+
+def _uptime_str():
+    """Human-readable uptime, recomputed at most once per second"""
+    global _uptime_cache
+    secs = int(time.monotonic() - _MONO_START)
+    if secs != _uptime_cache[0]:
+        days, rem = divmod(secs, 86400)
+        hours, rem = divmod(rem, 3600)
+        minutes, seconds = divmod(rem, 60)
+        text = f"{hours}:{minutes:02d}:{seconds:02d}"
+        if days:
+            text = f"{days} day{'s' if days != 1 else ''}, {text}"
+        _uptime_cache = (secs, text)
+    return _uptime_cache[1]
+
+try:
+    import uvicorn
+    from fastapi import FastAPI
+    from fastapi.responses import ORJSONResponse
+    from pydantic import BaseModel
+except ImportError:
+    uvicorn = None
+
+if uvicorn:
+    class HealthResponse(BaseModel):
+        status: str
+        bot: str
+        uptime: str
+        messages_processed: int
+
+    class StatsResponse(BaseModel):
+        messages_processed: int
+        prefixes: int
+        dump_channel_configured: bool
+        log_channel_configured: bool
+        uptime_seconds: float
+
+    # ORJSONResponse serializes with the Rust-backed orjson encoder instead
+    # of stdlib json - health probes hit these endpoints every few seconds
+    # Swagger/ReDoc/OpenAPI are dead weight for a pure health endpoint -
+    # disabling them skips schema generation and trims the request stack
+    fastapi_app = FastAPI(
+        title="Anime Caption Bot",
+        default_response_class=ORJSONResponse,
+        docs_url=None,
+        redoc_url=None,
+        openapi_url=None,
+    )
+
+    @fastapi_app.get("/health", response_model=HealthResponse)
+    async def health_check():
+        return HealthResponse(
+            status="ok",
+            bot="anime-caption-bot",
+            uptime=_uptime_str(),
+            messages_processed=bot_stats.messages_processed,
+        )
+
+    @fastapi_app.get("/stats", response_model=StatsResponse)
+    async def api_stats():
+        return StatsResponse(
+            messages_processed=bot_stats.messages_processed,
+            prefixes=len(prefixes),
+            dump_channel_configured=bool(dump_channel_id),
+            log_channel_configured=bool(log_channel_id),
+            uptime_seconds=time.monotonic() - _MONO_START,
+        )
+
+_health_server_task = None
+
+async def start_health_server():
+    """Serve the health endpoints on the bot's own event loop
+
+    Runs uvicorn.Server as an asyncio task instead of a dedicated
+    daemon thread: no extra thread, no GIL contention, one loop to
+    monitor. Signal handling stays with PTB.
+    """
+    global _health_server_task
+
+    if uvicorn is None:
+        logger.warning("fastapi/uvicorn not installed, health server disabled")
+        return
+
+    class _TaskServer(uvicorn.Server):
+        def install_signal_handlers(self):
+            pass
+
+    port = int(os.environ.get("PORT", "8080"))
+    config = uvicorn.Config(
+        fastapi_app,
+        host="0.0.0.0",
+        port=port,
+        log_level="warning",
+        access_log=False,  # Render already logs requests
+        http="httptools",
+    )
+    _health_server_task = asyncio.create_task(_TaskServer(config).serve())
+    logger.info(f"Health check server started on port {port}")
+
+# =============================================================================
+# OUTGOING MESSAGE RATE LIMITING
+# =============================================================================
+
+class _TokenBucket:
+    """Minimal asyncio token bucket refilled on a monotonic clock"""
+
+    def __init__(self, rate, per):
+        self.rate = rate
+        self.per = per
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(
+                float(self.rate),
+                self.tokens + (now - self.updated) * (self.rate / self.per)
+            )
+            self.updated = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return
+            await asyncio.sleep((1.0 - self.tokens) * (self.per / self.rate))
+
+class TgRateLimiter:
+    """Paces outgoing bot messages to Telegram's documented limits
+    (30 msg/sec globally, 20 msg/min per chat) so bursts queue here
+    instead of triggering 429 retry storms"""
+
+    def __init__(self):
+        self._global = _TokenBucket(30, 1.0)
+        self._per_chat = {}
+
+    async def send(self, bot, chat_id, **kwargs):
+        bucket = self._per_chat.get(chat_id)
+        if bucket is None:
+            bucket = self._per_chat.setdefault(chat_id, _TokenBucket(20, 60.0))
+        await self._global.acquire()
+        await bucket.acquire()
+        return await bot.send_message(chat_id=chat_id, **kwargs)
+
+tg_limiter = TgRateLimiter()
+
+# =============================================================================
+# LOG CHANNEL FUNCTIONALITY
+# =============================================================================
+
+_SEVERITY_EMOJI = {
+    "INFO": "ℹ️",
+    "WARNING": "⚠️",
+    "ERROR": "❌",
+    "SUCCESS": "✅",
+}
+
+_SEVERITY_LEVEL = {
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "SUCCESS": logging.INFO,
+}
+
+# Message templates built once; log lines are deliberately plain text so
+# Telegram never rejects a batch over an unescaped Markdown character
+_LOG_LINE_TPL = "{emoji} {type} ({ts}): {details}"
+# MarkdownV2 body: static specials pre-escaped, dynamic parts escaped per send
+_DUMP_TPL = "📤 *Auto\\-formatted Caption*\n\n`{caption}`\n\n⏰ Processed at: {date}"
+_STATS_REPORT_TPL = (
+    "📊 Periodic Stats Report\n\n"
+    "📨 Messages processed: {processed}\n"
+    "✅ Successful formats: {successful}\n"
+    "❌ Failed formats: {failed}\n"
+    "🎯 Success rate: {rate:.1f}%\n"
+    "📤 Dump channel sends: {dump_sends}\n"
+    "⚠️ Errors: {errors}\n"
+    "⏱ Uptime: {days}d {hours}h {minutes}m"
+)
+
+_ts_cache = (0, "")
+
+def _utc_ts():
+    """UTC timestamp string, reformatted at most once per second -
+    strftime and tz-aware datetime.now are heavy for per-event use"""
+    global _ts_cache
+    sec = int(time.time())
+    if sec != _ts_cache[0]:
+        _ts_cache = (sec, time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime(sec)))
+    return _ts_cache[1]
+
+class LogChannelManager:
+    """Buffered log channel manager that batches events into single messages
+    to stay well under Telegram's API rate limits"""
+
+    def __init__(self, log_channel=""):
+        self.log_channel = log_channel
+        self.bot_context = None  # Set once the Application is built
+        self.message_buffer = []
+        self.buffer_size = 10
+        self.flush_interval = 0.5
+        self.dropped_logs = 0
+        self._lock = None
+        self._tg_queue = None
+        self._worker_task = None
+        self._flusher_task = None
+
+    def _ensure_workers(self):
+        """Lazily create the queue, lock and background tasks on the loop"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        if self._tg_queue is None:
+            self._tg_queue = asyncio.Queue(maxsize=1000)
+        if self._worker_task is None or self._worker_task.done():
+            self._worker_task = asyncio.create_task(self._log_worker())
+        if self._flusher_task is None or self._flusher_task.done():
+            self._flusher_task = asyncio.create_task(self._flusher())
+
+    async def log_action(self, action_type, details, user_info="", severity="INFO"):
+        """Record a bot event locally and queue it for the log channel"""
+        try:
+            # Check the active sinks first so the common "nothing to do"
+            # case pays for neither the dict nor the message string
+            send_to_channel = bool(self.log_channel and self.bot_context)
+            level = _SEVERITY_LEVEL.get(severity, logging.INFO)
+            to_logger = logger.isEnabledFor(level)
+            if not send_to_channel and not to_logger:
+                return
+
+            if to_logger:
+                logger.log(level, "[%s] %s: %s", severity, action_type, details)
+
+            if send_to_channel:
+                log_entry = {
+                    "type": action_type,
+                    "details": details,
+                    "user": user_info,
+                    "severity": severity,
+                    "ts": _utc_ts(),
+                }
+                self._ensure_workers()
+                try:
+                    self._tg_queue.put_nowait(log_entry)
+                except asyncio.QueueFull:
+                    # Shed load rather than backpressure the caller
+                    self.dropped_logs += 1
+
+        except Exception as e:
+            logger.warning(f"Failed to log action: {e}")
+
+    def log_user_command(self, command, update):
+        """Queue a command-usage entry without blocking the handler
+
+        Plain sync enqueue: the handler pays one put_nowait, and the
+        batching worker turns many of these into one channel message.
+        """
+        if not (self.log_channel and self.bot_context):
+            return
+        log_entry = {
+            "type": "Command Used",
+            "details": command,
+            "user": get_user_info(update),
+            "severity": "INFO",
+            "ts": _utc_ts(),
+        }
+        self._ensure_workers()
+        try:
+            self._tg_queue.put_nowait(log_entry)
+        except asyncio.QueueFull:
+            self.dropped_logs += 1
+
+    async def _log_worker(self):
+        """Drain queued entries into the send buffer"""
+        while True:
+            log_entry = await self._tg_queue.get()
+            try:
+                await self._send_to_log_channel(log_entry)
+            except Exception as e:
+                # Single safety net for the worker; the flush path below
+                # already handles the expected Telegram errors specifically
+                logger.error(f"Unexpected error in log worker: {e}")
+
+    async def _send_to_log_channel(self, log_entry):
+        """Buffer the entry; flush as one batched message when full"""
+        emoji = _SEVERITY_EMOJI.get(log_entry["severity"], "📝")
+
+        line = _LOG_LINE_TPL.format(
+            emoji=emoji,
+            type=log_entry['type'],
+            ts=log_entry['ts'],
+            details=log_entry['details'],
+        )
+        if log_entry["user"]:
+            line += f"\n👤 {log_entry['user']}"
+
+        self.message_buffer.append(line)
+        if len(self.message_buffer) >= self.buffer_size:
+            await self._flush_buffer()
+
+    async def _flush_buffer(self):
+        """Send all buffered log lines as a single Telegram message"""
+        async with self._lock:
+            if not self.message_buffer or not self.bot_context:
+                return
+
+            # One message per flush; Telegram allows up to 4096 chars
+            self.message_buffer.append(bot_stats.footer)
+            text = "\n\n".join(self.message_buffer)[:4000]
+            self.message_buffer.clear()
+
+            try:
+                await self._send_batch(text)
+            except RetryAfter as e:
+                # Flood control: wait out the window, then retry once
+                await asyncio.sleep(e.retry_after)
+                try:
+                    await self._send_batch(text)
+                except TelegramError as retry_err:
+                    logger.warning(f"Log channel retry failed: {retry_err}")
+            except TelegramError as e:
+                logger.warning(f"Failed to send to log channel: {e}")
+
+    async def _send_batch(self, text):
+        """Send one batched log message to the channel (plain text)"""
+        await tg_limiter.send(
+            self.bot_context.bot,
+            chat_id=self.log_channel,
+            text=text
+        )
+
+    async def _flusher(self):
+        """Background task flushing any buffered entries periodically"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self.message_buffer:
+                try:
+                    await self._flush_buffer()
+                except Exception as e:
+                    logger.error(f"Unexpected error in log flusher: {e}")
+
+    async def send_stats_report(self):
+        """Send an aggregated stats summary to the log channel"""
+        if not (self.log_channel and self.bot_context):
+            return
+
+        stats = bot_stats
+        secs = int(time.monotonic() - _MONO_START)
+        days, rem = divmod(secs, 86400)
+        hours, rem = divmod(rem, 3600)
+        minutes = rem // 60
+
+        text = _STATS_REPORT_TPL.format(
+            processed=stats.messages_processed,
+            successful=stats.successful_formats,
+            failed=stats.failed_formats,
+            rate=_success_rate(),
+            dump_sends=stats.dump_channel_sends,
+            errors=stats.errors,
+            days=days,
+            hours=hours,
+            minutes=minutes,
+        )
+
+        try:
+            await self._send_batch(text)
+        except TelegramError as e:
+            logger.warning(f"Failed to send stats report: {e}")
+
+log_manager = LogChannelManager(log_channel_id)
+
+async def periodic_stats_task():
+    """Fallback stats loop when the JobQueue extra is not installed"""
+    while True:
+        await asyncio.sleep(21600)
+        try:
+            await log_manager.send_stats_report()
+        except Exception as e:
+            logger.warning(f"Periodic stats report failed: {e}")
+
+async def _stats_report_job(context: ContextTypes.DEFAULT_TYPE):
+    """JobQueue callback wrapping the stats report"""
+    await log_manager.send_stats_report()
 
 # =============================================================================
 # DUMP CHANNEL FUNCTIONALITY
@@ -422,20 +998,30 @@ async def send_to_dump_channel(context: ContextTypes.DEFAULT_TYPE, message, form
     
     max_retries = 3
     retry_count = 0
-    
+
+    # Escape once outside the retry loop; the V2 parser rejects any
+    # unescaped special, so dynamic content must go through the helper
+    text = _DUMP_TPL.format(
+        caption=escape_markdown(formatted_caption, version=2, entity_type='code'),
+        date=escape_markdown(str(message.date), version=2),
+    )
+
     while retry_count < max_retries:
         try:
-            await context.bot.send_message(
+            await tg_limiter.send(
+                context.bot,
                 chat_id=dump_channel_id,
-                text=f"📤 **Auto-formatted Caption**\n\n`{formatted_caption}`\n\n⏰ Processed at: {message.date}",
-                parse_mode='Markdown'
+                text=text,
+                parse_mode=ParseMode.MARKDOWN_V2
             )
-            logger.info(f"Successfully sent to dump channel: {dump_channel_id}")
+            bot_stats.dump_channel_sends += 1
+            bot_stats.last_dump_ok_ts = time.monotonic()
+            logger.info("Successfully sent to dump channel: %s", dump_channel_id)
             return True, "Success"
             
         except TelegramError as e:
             retry_count += 1
-            logger.warning(f"Failed to send to dump channel (attempt {retry_count}): {e}")
+            logger.warning("Failed to send to dump channel (attempt %d): %s", retry_count, e)
             
             error_str = str(e).lower()
             if "chat not found" in error_str:
@@ -494,78 +1080,234 @@ async def check_dump_channel_status(context: ContextTypes.DEFAULT_TYPE):
 # COMMAND HANDLERS
 # =============================================================================
 
+# Static reply bodies are built once at import time; handlers just ship
+# the interned string instead of re-assembling it per call
+_WELCOME_MSG = (
+    "🎬 **Professional Anime Caption Formatter** 🎬\n\n"
+    "Enhanced with prefix management and dump channel functionality!\n\n"
+    "**✨ Key Features:**\n"
+    "• Professional quality formatting (480P, 720P, 1080P)\n"
+    "• Dynamic prefix management\n"
+    "• Dump channel integration\n"
+    "• Multiple input format support\n"
+    "• Language detection (Tamil, English, Multi)\n\n"
+    "**🎯 Quality Order:** 480P → 720P → 1080P\n\n"
+    "**📝 Commands:**\n"
+    "• `/addprefix PREFIX` - Add new prefix\n"
+    "• `/prefixlist` - Show all prefixes\n"
+    "• `/delprefix INDEX` - Delete prefix\n"
+    "• `/dumpchannel ID` - Set dump channel\n"
+    "• `/dumpstatus` - Check dump channel\n\n"
+    "**🚀 Usage:** Send videos/documents with captions!"
+)
+
+_HELP_MSG = (
+    "❓ **Help & Examples**\n\n"
+    "Send any video or document with a caption and the bot replies with "
+    "the formatted version.\n\n"
+    "**Supported caption formats:**\n"
+    "• `Anime Name S01 EP05 720p Tamil`\n"
+    "• `[S2-E8] Anime Name [480p] [Dual]`\n"
+    "• `Anime Name EP12 1080p`\n\n"
+    "**Settings commands:**\n"
+    "• `/name NAME` - Fix the anime name (or `/name reset`)\n"
+    "• `/addprefix PREFIX` - Add a prefix to the rotation\n"
+    "• `/prefixlist` - Show all prefixes\n"
+    "• `/delprefix INDEX` - Remove a prefix\n"
+    "• `/dumpchannel ID` - Set the dump channel\n"
+    "• `/status` - Bot status and settings\n"
+    "• `/quality` - Supported quality formats"
+)
+
+_QUALITY_MSG = (
+    "🎥 **Supported Quality Formats**\n\n"
+    "• `144p` • `240p` • `360p` • `480p`\n"
+    "• `720p` • `1080p` • `1440p` • `2160p`\n\n"
+    "Qualities are detected from patterns like `720p`, `[1080p]` or "
+    "`Quality: 480p` and rendered in the standard `720P` form.\n\n"
+    "**🎯 Recommended order:** 480P → 720P → 1080P"
+)
+
+_STATUS_TPL = (
+    "📊 **Bot Status**\n\n"
+    "**Anime name:** {name}\n"
+    "**Prefixes:** {prefix_count}\n"
+    "**Dump channel:** {dump}\n"
+    "**Log channel:** {log}\n\n"
+    "**Messages processed:** {processed}\n"
+    "**Success rate:** {rate:.1f}%\n"
+    "**Uptime:** {days}d {hours}h {minutes}m"
+)
+
+_STATS_TPL = (
+    "📈 **Bot Statistics**\n\n"
+    "📨 Messages processed: {processed}\n"
+    "✅ Successful formats: {successful}\n"
+    "❌ Failed formats: {failed}\n"
+    "🎯 Success rate: {rate:.1f}%\n"
+    "📤 Dump channel sends: {dump_sends}\n"
+    "📛 Dump channel fails: {dump_fails}\n"
+    "⚠️ Errors: {errors}\n"
+    "⏱ Uptime: {days}d {hours}h {minutes}m"
+)
+
+# Shared by /dumpchannel and /logchannel - one constant, one allocation
+_INVALID_CHANNEL_MSG = (
+    "❌ **Invalid channel format!**\n\n"
+    "Use a `-100...` channel ID or an `@channelname`."
+)
+
+_NAME_USAGE_TPL = (
+    "📝 **Current anime name:** {current}\n\n"
+    "**Usage:**\n"
+    "• `/name YOUR ANIME NAME` - Set fixed name\n"
+    "• `/name reset` - Enable auto-detection\n\n"
+    "**Examples:**\n"
+    "• `/name Naruto Shippuden Tam`\n"
+    "• `/name One Piece Eng`\n"
+    "• `/name reset`"
+)
+
+# Static menu built once at import; post_init just ships it to Telegram
+_BOT_COMMANDS = (
+    BotCommand("start", "🚀 Start the bot and see instructions"),
+    BotCommand("name", "📝 Set/view anime name (fixed or auto-detect)"),
+    BotCommand("format", "🔧 Test caption formatting on any text"),
+    BotCommand("status", "📊 Show bot status and current settings"),
+    BotCommand("help", "❓ Show detailed help and examples"),
+    BotCommand("quality", "🎥 Show supported quality formats"),
+    BotCommand("addprefix", "➕ Add new prefix to rotation"),
+    BotCommand("prefixlist", "📋 Show all current prefixes"),
+    BotCommand("delprefix", "➖ Delete prefix from rotation"),
+    BotCommand("dumpchannel", "📤 Set/check dump channel"),
+    BotCommand("dumpstatus", "📡 Check dump channel status"),
+)
+
 async def setup_commands(application):
     """Set up bot commands menu"""
     try:
-        commands = [
-            BotCommand("start", "🚀 Start the bot and see instructions"),
-            BotCommand("name", "📝 Set/view anime name (fixed or auto-detect)"),
-            BotCommand("format", "🔧 Test caption formatting on any text"),
-            BotCommand("status", "📊 Show bot status and current settings"),
-            BotCommand("help", "❓ Show detailed help and examples"),
-            BotCommand("quality", "🎥 Show supported quality formats"),
-            BotCommand("addprefix", "➕ Add new prefix to rotation"),
-            BotCommand("prefixlist", "📋 Show all current prefixes"),
-            BotCommand("delprefix", "➖ Delete prefix from rotation"),
-            BotCommand("dumpchannel", "📤 Set/check dump channel"),
-            BotCommand("dumpstatus", "📡 Check dump channel status"),
-        ]
-        await application.bot.set_my_commands(commands)
+        await application.bot.set_my_commands(_BOT_COMMANDS)
         logger.info("Bot commands menu set up successfully")
     except Exception as e:
         logger.warning(f"Failed to set up command menu: {e}")
 
+async def reply(update, text, parse_mode='Markdown'):
+    """Reply to the triggering message (single choke point for handlers)"""
+    return await update.message.reply_text(
+        text,
+        parse_mode=parse_mode,
+        reply_to_message_id=update.message.message_id
+    )
+
+def get_user_info(update):
+    """Build the 'Name (@username)' label once per update"""
+    user = update.effective_user
+    if user is None:
+        return "unknown"
+    if user.username:
+        return f"{user.first_name} (@{user.username})"
+    return user.first_name
+
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /start command"""
     try:
-        await setup_commands(context.application)
-        
-        welcome_message = (
-            "🎬 **Professional Anime Caption Formatter** 🎬\n\n"
-            "Enhanced with prefix management and dump channel functionality!\n\n"
-            "**✨ Key Features:**\n"
-            "• Professional quality formatting (480P, 720P, 1080P)\n"
-            "• Dynamic prefix management\n"
-            "• Dump channel integration\n"
-            "• Multiple input format support\n"
-            "• Language detection (Tamil, English, Multi)\n\n"
-            "**🎯 Quality Order:** 480P → 720P → 1080P\n\n"
-            "**📝 Commands:**\n"
-            "• `/addprefix PREFIX` - Add new prefix\n"
-            "• `/prefixlist` - Show all prefixes\n"
-            "• `/delprefix INDEX` - Delete prefix\n"
-            "• `/dumpchannel ID` - Set dump channel\n"
-            "• `/dumpstatus` - Check dump channel\n\n"
-            "**🚀 Usage:** Send videos/documents with captions!"
-        )
-        await update.message.reply_text(welcome_message, parse_mode='Markdown')
+        log_manager.log_user_command("/start", update)
+        await update.message.reply_text(_WELCOME_MSG, parse_mode='Markdown')
     
     except Exception as e:
         logger.error(f"Error in start command: {e}")
-        await update.message.reply_text(
+        await reply(
+            update,
             "🚀 Professional Anime Caption Formatter Bot is running!\n"
             "Send videos/documents with captions to format them.",
-            reply_to_message_id=update.message.message_id
+            parse_mode=None,
+        )
+
+async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /help command"""
+    try:
+        log_manager.log_user_command("/help", update)
+        await reply(
+            update,
+            _HELP_MSG,
         )
+    except Exception as e:
+        logger.error(f"Error in help command: {e}")
+
+async def quality_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /quality command"""
+    try:
+        log_manager.log_user_command("/quality", update)
+        await reply(
+            update,
+            _QUALITY_MSG,
+        )
+    except Exception as e:
+        logger.error(f"Error in quality command: {e}")
+
+def _uptime_parts():
+    """Break the bot's uptime into (days, hours, minutes)
+
+    Monotonic float subtraction instead of allocating a tz-aware
+    datetime plus timedelta per call, and immune to wall-clock steps.
+    """
+    secs = int(time.monotonic() - _MONO_START)
+    days, rem = divmod(secs, 86400)
+    hours, rem = divmod(rem, 3600)
+    return days, hours, rem // 60
+
+async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /status command"""
+    try:
+        log_manager.log_user_command("/status", update)
+        days, hours, minutes = _uptime_parts()
+        await reply(
+            update,
+            _STATUS_TPL.format(
+                name=fixed_anime_name or "Auto-detect mode",
+                prefix_count=len(prefixes),
+                dump=dump_channel_id or "Not set",
+                log=log_channel_id or "Not set",
+                processed=bot_stats.messages_processed,
+                rate=_success_rate(),
+                days=days, hours=hours, minutes=minutes,
+            ),
+        )
+    except Exception as e:
+        logger.error(f"Error in status command: {e}")
+
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /stats command"""
+    try:
+        log_manager.log_user_command("/stats", update)
+        days, hours, minutes = _uptime_parts()
+        await reply(
+            update,
+            _STATS_TPL.format(
+                processed=bot_stats.messages_processed,
+                successful=bot_stats.successful_formats,
+                failed=bot_stats.failed_formats,
+                rate=_success_rate(),
+                dump_sends=bot_stats.dump_channel_sends,
+                dump_fails=bot_stats.dump_channel_fails,
+                errors=bot_stats.errors,
+                days=days, hours=hours, minutes=minutes,
+            ),
+        )
+    except Exception as e:
+        logger.error(f"Error in stats command: {e}")
 
 async def name_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /name command"""
     global fixed_anime_name
-    
+
     try:
+        log_manager.log_user_command("/name", update)
         if not context.args:
             current_name = fixed_anime_name or "Auto-detect mode"
-            await update.message.reply_text(
-                f"📝 **Current anime name:** {current_name}\n\n"
-                "**Usage:**\n"
-                "• `/name YOUR ANIME NAME` - Set fixed name\n"
-                "• `/name reset` - Enable auto-detection\n\n"
-                "**Examples:**\n"
-                "• `/name Naruto Shippuden Tam`\n"
-                "• `/name One Piece Eng`\n"
-                "• `/name reset`",
-                parse_mode='Markdown',
-                reply_to_message_id=update.message.message_id
+            await reply(
+                update,
+                _NAME_USAGE_TPL.format(current=current_name),
             )
             return
         
@@ -573,76 +1315,329 @@ async def name_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         if new_name.lower() == "reset":
             fixed_anime_name = ""
-            save_config()
-            await update.message.reply_text(
+            _schedule_save()
+            logger.info("Fixed anime name reset by %s", get_user_info(update))
+            await reply(
+                update,
                 "✅ **Fixed anime name reset!**\n\n"
                 "Now using auto-detection mode.",
-                parse_mode='Markdown',
-                reply_to_message_id=update.message.message_id
             )
         else:
             fixed_anime_name = new_name
-            save_config()
-            await update.message.reply_text(
+            _schedule_save()
+            await reply(
+                update,
                 f"✅ **Fixed anime name set!**\n\n"
                 f"**Name:** {fixed_anime_name}\n\n"
                 "All episodes will use this name until reset.",
-                parse_mode='Markdown',
-                reply_to_message_id=update.message.message_id
             )
     
     except Exception as e:
         logger.error(f"Error in name command: {e}")
-        await update.message.reply_text(
+        await reply(
+                update,
             "❌ Error processing command. Please try again.",
-            reply_to_message_id=update.message.message_id
+            parse_mode=None,
         )
 
 async def addprefix_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /addprefix command"""
     global prefixes
-    
+
     try:
+        log_manager.log_user_command("/addprefix", update)
         if not context.args:
-            await update.message.reply_text(
+            await reply(
+            update,
                 "➕ **Add New Prefix**\n\n"
                 "**Usage:** `/addprefix YOUR_PREFIX`\n\n"
                 f"**Current prefixes:** {len(prefixes)}",
-                parse_mode='Markdown',
-                reply_to_message_id=update.message.message_id
             )
             return
         
         new_prefix = ' '.join(context.args).strip()
         
-        if new_prefix in prefixes:
-            await update.message.reply_text(
+        if new_prefix in _prefix_set:
+            await reply(
+                update,
                 f"⚠️ **Prefix already exists!**\n\n"
                 f"**Prefix:** `{new_prefix}`",
-                parse_mode='Markdown',
-                reply_to_message_id=update.message.message_id
             )
             return
         
         prefixes.append(new_prefix)
-        save_config()
+        _rebuild_prefix_cycle()
+        _schedule_save()
+        logger.info("Prefix added by %s: %s", get_user_info(update), new_prefix)
         
-        await update.message.reply_text(
+        await reply(
+            update,
             f"✅ **Prefix added successfully!**\n\n"
             f"**New prefix:** `{new_prefix}`\n"
             f"**Total prefixes:** {len(prefixes)}",
-            parse_mode='Markdown',
-            reply_to_message_id=update.message.message_id
         )
     
     except Exception as e:
         logger.error(f"Error in addprefix command: {e}")
-        await update.message.reply_text(
+        await reply(
+                update,
             "❌ Error processing command.",
-            reply_to_message_id=update.message.message_id
+            parse_mode=None,
         )
 
+async def delprefix_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /delprefix command"""
+    global prefixes
+
+    try:
+        log_manager.log_user_command("/delprefix", update)
+
+        if not context.args:
+            await reply(
+            update,
+                "➖ **Delete Prefix**\n\n"
+                "**Usage:** `/delprefix INDEX`\n"
+                "See `/prefixlist` for the numbered list.",
+            )
+            return
+
+        try:
+            index = int(context.args[0])
+        except ValueError:
+            index = 0
+
+        if not 1 <= index <= len(prefixes):
+            await reply(
+                update,
+                f"⚠️ **Invalid index!**\n\n"
+                f"Pick a number between 1 and {len(prefixes)}.",
+            )
+            return
+
+        removed = prefixes.pop(index - 1)
+        _rebuild_prefix_cycle()
+        _schedule_save()
+        logger.info("Prefix removed by %s: %s", get_user_info(update), removed)
+
+        await reply(
+            update,
+            f"✅ **Prefix deleted!**\n\n"
+            f"**Removed:** `{removed}`\n"
+            f"**Remaining prefixes:** {len(prefixes)}",
+        )
+
+    except Exception as e:
+        logger.error(f"Error in delprefix command: {e}")
+        await reply(
+                update,
+            "❌ Error processing command.",
+            parse_mode=None,
+        )
+
+async def prefixlist_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /prefixlist command"""
+    global _prefix_list_cache
+
+    try:
+        log_manager.log_user_command("/prefixlist", update)
+
+        if not prefixes:
+            await reply(
+            update,
+                "📋 **No prefixes configured.**\n\n"
+                "Add one with `/addprefix YOUR_PREFIX`.",
+            )
+            return
+
+        if _prefix_list_cache is None:
+            _prefix_list_cache = "\n".join(
+                f"{i}. `{p}`" for i, p in enumerate(prefixes, 1)
+            )
+
+        await reply(
+            update,
+            f"📋 **Current Prefixes ({len(prefixes)})**\n\n"
+            f"{_prefix_list_cache}\n\n"
+            "Each prefix is used 3 times before rotating to the next.",
+        )
+
+    except Exception as e:
+        logger.error(f"Error in prefixlist command: {e}")
+        await reply(
+                update,
+            "❌ Error processing command.",
+            parse_mode=None,
+        )
+
+def _is_valid_channel(value):
+    """Accept -100... channel IDs and @channelname handles"""
+    return value.startswith('@') or (
+        value.startswith('-100') and value.lstrip('-').isdigit()
+    )
+
+async def dumpchannel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /dumpchannel command"""
+    global dump_channel_id
+
+    try:
+        log_manager.log_user_command("/dumpchannel", update)
+
+        if not context.args:
+            current = dump_channel_id or "Not set"
+            await reply(
+            update,
+                f"📤 **Dump Channel**\n\n"
+                f"**Current:** `{current}`\n\n"
+                "**Usage:** `/dumpchannel -100xxxxxxxxxx` or `/dumpchannel @channelname`",
+            )
+            return
+
+        new_channel = context.args[0].strip()
+
+        if not _is_valid_channel(new_channel):
+            await reply(update, _INVALID_CHANNEL_MSG)
+            return
+
+        dump_channel_id = new_channel
+        bot_stats.last_dump_ok_ts = None
+        _schedule_save()
+        logger.info("Dump channel set by %s: %s", get_user_info(update), new_channel)
+
+        await reply(
+            update,
+            f"✅ **Dump channel set!**\n\n"
+            f"**Channel:** `{new_channel}`\n\n"
+            "Formatted captions will be forwarded there.",
+        )
+
+    except Exception as e:
+        logger.error(f"Error in dumpchannel command: {e}")
+        await reply(
+                update,
+            "❌ Error processing command.",
+            parse_mode=None,
+        )
+
+async def dumpstatus_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /dumpstatus command"""
+    try:
+        log_manager.log_user_command("/dumpstatus", update)
+
+        if not dump_channel_id:
+            await reply(
+            update,
+                "📡 **Dump Channel Status**\n\n"
+                "❌ No dump channel configured.\n"
+                "Set one with `/dumpchannel ID`.",
+            )
+            return
+
+        # Live probe only on explicit request; the default view reads the
+        # cached last-success timestamp and sends nothing to the channel
+        if context.args and context.args[0].lower() == "test":
+            ok, status = await check_dump_channel_status(context)
+            if ok:
+                detail = f"✅ Accessible: **{status['title']}** ({status['type']})"
+            else:
+                detail = f"❌ {status}"
+        elif bot_stats.last_dump_ok_ts is not None:
+            ago = int(time.monotonic() - bot_stats.last_dump_ok_ts)
+            detail = f"✅ Active (last successful send {ago}s ago)"
+        else:
+            detail = (
+                "ℹ️ No sends yet this session.\n"
+                "Use `/dumpstatus test` for a live check."
+            )
+
+        await reply(
+            update,
+            f"📡 **Dump Channel Status**\n\n"
+            f"**Channel:** `{dump_channel_id}`\n"
+            f"{detail}",
+        )
+
+    except Exception as e:
+        logger.error(f"Error in dumpstatus command: {e}")
+        await reply(
+                update,
+            "❌ Error processing command.",
+            parse_mode=None,
+        )
+
+async def logchannel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /logchannel command"""
+    global log_channel_id
+
+    try:
+        log_manager.log_user_command("/logchannel", update)
+
+        if not context.args:
+            current = log_channel_id or "Not set"
+            await reply(
+                update,
+                f"📝 **Log Channel**\n\n"
+                f"**Current:** `{current}`\n\n"
+                "**Usage:** `/logchannel -100xxxxxxxxxx` or `/logchannel @channelname`\n"
+                "Set the `LOG_CHANNEL_ID` env var to persist across restarts.",
+            )
+            return
+
+        new_channel = context.args[0].strip()
+
+        if not _is_valid_channel(new_channel):
+            await reply(update, _INVALID_CHANNEL_MSG)
+            return
+
+        log_channel_id = new_channel
+        log_manager.log_channel = new_channel
+        logger.info("Log channel set by %s: %s", get_user_info(update), new_channel)
+
+        await reply(
+            update,
+            f"✅ **Log channel set!**\n\n"
+            f"**Channel:** `{new_channel}`",
+        )
+
+    except Exception as e:
+        logger.error(f"Error in logchannel command: {e}")
+        await reply(
+            update,
+            "❌ Error processing command.",
+            parse_mode=None,
+        )
+
+# Per-chat work queues: concurrent updates from different chats proceed
+# in parallel while messages within one chat stay strictly ordered
+_chat_queues = {}
+_chat_consumers = {}
+
+async def _chat_consumer(chat_id, work_queue):
+    """Drain one chat's media updates in arrival order"""
+    while True:
+        update, context = await work_queue.get()
+        try:
+            await _process_media_update(update, context)
+        except Exception as e:
+            logger.error("Error processing media for chat %s: %s", chat_id, e)
+        finally:
+            work_queue.task_done()
+
 async def handle_media_with_caption(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Dispatch captioned media onto its chat's ordered queue"""
+    chat = update.effective_chat
+    chat_id = chat.id if chat else 0
+
+    work_queue = _chat_queues.get(chat_id)
+    if work_queue is None:
+        work_queue = asyncio.Queue(maxsize=256)
+        _chat_queues[chat_id] = work_queue
+        _chat_consumers[chat_id] = asyncio.create_task(
+            _chat_consumer(chat_id, work_queue)
+        )
+
+    await work_queue.put((update, context))
+
+async def _process_media_update(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle media messages with captions"""
     try:
         message = update.message
@@ -650,42 +1645,72 @@ async def handle_media_with_caption(update: Update, context: ContextTypes.DEFAUL
         
         if not original_caption:
             return
-        
-        logger.info(f"Processing caption: {original_caption}")
-        
-        formatted_caption = parse_caption(original_caption)
+
+        # Fast-reject obvious non-matches before paying for the parser
+        if not _FAST_REJECT_RE.search(original_caption):
+            logger.debug("Caption skipped by fast-reject: %s", original_caption)
+            return
+
+        logger.info("Processing caption: %s", original_caption)
+
+        async with _format_semaphore:
+            formatted_caption = parse_caption(original_caption)
         
         if formatted_caption and formatted_caption != original_caption:
-            # Send to dump channel if configured
+            # HTML with escaped content: a stray backtick or underscore in
+            # a caption can make the Markdown parser reject the whole send
+            reply_coro = reply(
+                update,
+                f"\n<code>{html.escape(formatted_caption)}</code>\n",
+                parse_mode='HTML',
+            )
+
+            # Reply and dump-channel forward are independent round-trips;
+            # overlap them instead of paying the latencies back to back
             if dump_channel_id:
-                dump_success, dump_message = await send_to_dump_channel(context, message, formatted_caption)
-                if dump_success:
-                    logger.info("Successfully sent to dump channel")
+                reply_result, dump_result = await asyncio.gather(
+                    reply_coro,
+                    send_to_dump_channel(context, message, formatted_caption),
+                    return_exceptions=True,
+                )
+                if isinstance(dump_result, Exception):
+                    bot_stats.dump_channel_fails += 1
+                    logger.warning("Failed to send to dump channel: %s", dump_result)
                 else:
-                    logger.warning(f"Failed to send to dump channel: {dump_message}")
-            
-            await message.reply_text(
-                f"\n`{formatted_caption}`\n",
-                parse_mode='Markdown',
-                reply_to_message_id=message.message_id
-            )
-            
-            save_config()
+                    dump_success, dump_message = dump_result
+                    if dump_success:
+                        logger.info("Successfully sent to dump channel")
+                    else:
+                        bot_stats.dump_channel_fails += 1
+                        logger.warning("Failed to send to dump channel: %s", dump_message)
+                if isinstance(reply_result, Exception):
+                    raise reply_result
+            else:
+                await reply_coro
+
+            # Routine successes are counted in bot_stats and surfaced in
+            # the periodic stats report; no per-message channel traffic
+            logger.debug("Caption formatted: %s", formatted_caption)
+
+            # Persist the rotation counter through the debounced writer;
+            # bursts of media collapse into a single disk write
+            _schedule_save()
         else:
-            await message.reply_text(
+            await reply(
+                update,
                 "❌ **Parsing Failed**\n\n"
                 "Could not parse the caption format.\n"
                 "Try `/format YOUR_TEXT` to test formats.",
-                parse_mode='Markdown',
-                reply_to_message_id=message.message_id
             )
     
     except Exception as e:
-        logger.error(f"Error handling media: {e}")
+        bot_stats.errors += 1
+        logger.error("Error handling media: %s", e)
         try:
-            await update.message.reply_text(
+            await reply(
+                update,
                 "❌ Error processing your request.",
-                reply_to_message_id=update.message.message_id
+                parse_mode=None,
             )
         except:
             pass
@@ -694,6 +1719,24 @@ async def handle_media_with_caption(update: Update, context: ContextTypes.DEFAUL
 # APPLICATION SETUP WITH COMPATIBILITY FIX
 # =============================================================================
 
+async def _post_init(application):
+    """Hook run by PTB once the event loop is up"""
+    global _config_writer_task
+    _config_writer_task = asyncio.create_task(_config_writer())
+    if os.environ.get("ENABLE_HEALTH_CHECK", "").lower() in ("1", "true", "yes"):
+        await start_health_server()
+    await setup_commands(application)
+    if log_channel_id:
+        # Prefer the JobQueue: one shared scheduler heap, automatic
+        # cancellation on shutdown, and a phase offset so restarts do
+        # not all fire at the channel simultaneously
+        if application.job_queue is not None:
+            application.job_queue.run_repeating(
+                _stats_report_job, interval=21600, first=300
+            )
+        else:
+            asyncio.create_task(periodic_stats_task())
+
 async def create_application():
     """Create and configure the Application with compatibility handling"""
     try:
@@ -701,22 +1744,35 @@ async def create_application():
         # This approach is more compatible with different Python versions
         builder = Application.builder()
         builder = builder.token(BOT_TOKEN)
-        
+        # Process updates concurrently instead of strictly one at a time
+        builder = builder.concurrent_updates(256)
+        builder = builder.post_init(_post_init)
+
         # Build the application
         application = builder.build()
-        
+
+        # Give the log manager a bot reference for channel sends
+        log_manager.bot_context = application
+
         # Add handlers
         application.add_handler(CommandHandler("start", start_command))
+        application.add_handler(CommandHandler("help", help_command))
+        application.add_handler(CommandHandler("quality", quality_command))
+        application.add_handler(CommandHandler("status", status_command))
+        application.add_handler(CommandHandler("stats", stats_command))
         application.add_handler(CommandHandler("name", name_command))
         application.add_handler(CommandHandler("addprefix", addprefix_command))
+        application.add_handler(CommandHandler("prefixlist", prefixlist_command))
+        application.add_handler(CommandHandler("delprefix", delprefix_command))
+        application.add_handler(CommandHandler("dumpchannel", dumpchannel_command))
+        application.add_handler(CommandHandler("dumpstatus", dumpstatus_command))
+        application.add_handler(CommandHandler("logchannel", logchannel_command))
         
         # Add media handlers with better filtering
+        # One combined filter: the dispatcher evaluates a single handler
+        # entry per update instead of one per media type
         application.add_handler(MessageHandler(
-            filters.Document.ALL & filters.CAPTION,
-            handle_media_with_caption
-        ))
-        application.add_handler(MessageHandler(
-            filters.VIDEO & filters.CAPTION,
+            (filters.Document.ALL | filters.VIDEO | filters.PHOTO) & filters.CAPTION,
             handle_media_with_caption
         ))
         
@@ -735,7 +1791,7 @@ def main():
     
     print("🚀 Starting Professional Anime Caption Formatter Bot...")
     print(f"💾 Config file path: {CONFIG_FILE}")
-    
+
     # Load configuration
     config_loaded = load_config()
     if config_loaded:
@@ -752,7 +1808,15 @@ def main():
         print("Press Ctrl+C to stop.")
         
         # Run the bot
-        application.run_polling(allowed_updates=Update.ALL_TYPES)
+        # Max long-poll timeout: getUpdates blocks server-side up to 30s,
+        # so idle periods cost ~2 requests/min instead of several per
+        # second; poll_interval=0 re-polls immediately under load
+        application.run_polling(
+            allowed_updates=Update.ALL_TYPES,
+            timeout=30,
+            poll_interval=0.0,
+            drop_pending_updates=True,
+        )
         
     except KeyboardInterrupt:
         print("\n🛑 Bot stopped by user")